@@ -1,17 +1,21 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, HTTPException, status
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
 from loguru import logger
-import yaml
 import asyncio
+import inspect
 from typing import Dict, Optional
 from src.audio import AudioProcessor
 from src.speech import SpeechRecognizer
 from src.llm import LanguageModel
 from src.voice import VoiceSynthesizer
-from src.utils.config import Config
-from src.utils.session import SessionManager
+from src.utils.config import (
+    Config, Secrets, API_KEY_SERVICES,
+    AudioConfig, SpeechRecognitionConfig, LLMConfig, VoiceConfig
+)
+from src.utils.session import SessionManager, RedisSessionManager
 from src.utils.exceptions import *
 from datetime import datetime
 
@@ -36,31 +40,39 @@ app.add_middleware(
 
 # Load configuration
 try:
-    with open("config.yaml", "r") as f:
-        config = yaml.safe_load(f)
+    app_config = Config()
+    app_config.validate()
+    config = app_config.get_all()
 except Exception as e:
     logger.error(f"Failed to load configuration: {str(e)}")
     raise ConfigurationError("Failed to load configuration file")
 
 # Verify API keys
-required_keys = {
-    "RETELL_API_KEY": "Retell.ai",
-    "OPENAI_API_KEY": "OpenAI",
-    "DEEPGRAM_API_KEY": "Deepgram",
-    "ELEVENLABS_API_KEY": "ElevenLabs"
-}
-
-for key, service in required_keys.items():
-    if not os.getenv(key):
-        raise APIKeyError(f"Missing API key for {service}")
+try:
+    SECRETS = Secrets()
+except ValidationError as e:
+    services = ", ".join(API_KEY_SERVICES[error["loc"][0]] for error in e.errors())
+    raise APIKeyError(f"Missing API key for {services}")
 
 # Initialize components
 try:
-    audio_processor = AudioProcessor(config["audio"])
-    speech_recognizer = SpeechRecognizer(config["speech_recognition"])
-    language_model = LanguageModel(config["llm"])
-    voice_synthesizer = VoiceSynthesizer(config["voice"])
-    session_manager = SessionManager()
+    audio_processor = AudioProcessor(AudioConfig.from_dict(config["audio"]))
+    speech_recognizer = SpeechRecognizer(
+        SpeechRecognitionConfig.from_dict(config["speech_recognition"]),
+        api_key=SECRETS.deepgram_api_key.get_secret_value()
+    )
+    language_model = LanguageModel(
+        LLMConfig.from_dict(config["llm"]),
+        api_key=SECRETS.openai_api_key.get_secret_value()
+    )
+    voice_synthesizer = VoiceSynthesizer(
+        VoiceConfig.from_dict(config["voice"]),
+        api_key=SECRETS.elevenlabs_api_key.get_secret_value()
+    )
+    
+    # Share sessions across workers through Redis when it is configured
+    redis_url = os.getenv("REDIS_URL")
+    session_manager = RedisSessionManager(redis_url) if redis_url else SessionManager()
 except Exception as e:
     logger.error(f"Component initialization failed: {str(e)}")
     raise ConfigurationError("Failed to initialize components")
@@ -78,11 +90,58 @@ async def startup_event():
         logger.error(f"Startup failed: {str(e)}")
         raise ConfigurationError("Failed to initialize services")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release component resources on shutdown."""
+    await language_model.close()
+    await voice_synthesizer.close()
+    await session_manager.close()
+
+# Error type and message for each conversation pipeline stage
+STAGE_ERRORS = {
+    "audio": (AudioProcessingError, "Audio processing failed"),
+    "transcription": (TranscriptionError, "Speech recognition failed"),
+    "llm": (LLMError, "Language model processing failed"),
+    "synthesis": (VoiceSynthesisError, "Voice synthesis failed"),
+}
+
+async def _stage(name: str, func, *args, **kwargs):
+    """Run a pipeline stage, re-raising failures as that stage's error."""
+    error_type, message = STAGE_ERRORS[name]
+    try:
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    except VoiceAgentError:
+        raise
+    except Exception as e:
+        raise error_type(f"{message}: {str(e)}") from e
+
+async def _stage_stream(name: str, stream):
+    """Iterate a streaming pipeline stage, re-raising failures as that stage's error."""
+    error_type, message = STAGE_ERRORS[name]
+    try:
+        async for item in stream:
+            yield item
+    except VoiceAgentError:
+        raise
+    except Exception as e:
+        raise error_type(f"{message}: {str(e)}") from e
+
+async def _close_with_error(websocket: WebSocket, exc: Exception):
+    """Report an error to the client and close the connection."""
+    try:
+        await websocket.send_json({"error": str(exc), "type": exc.__class__.__name__})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    except Exception:
+        pass
+
 @app.websocket("/ws/conversation")
 async def websocket_endpoint(websocket: WebSocket):
     """Handle WebSocket connections for voice conversations."""
     await websocket.accept()
-    session_id = session_manager.create_session()
+    session_id = await session_manager.create_session()
     
     try:
         logger.info(f"New conversation session started: {session_id}")
@@ -94,56 +153,56 @@ async def websocket_endpoint(websocket: WebSocket):
                     websocket.receive_bytes(),
                     timeout=30.0
                 )
+            except asyncio.TimeoutError:
+                logger.warning(f"Session {session_id} timed out")
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                break
                 
-                # Process audio
-                try:
-                    processed_audio = audio_processor.process(audio_data)
-                except Exception as e:
-                    raise AudioProcessingError(f"Audio processing failed: {str(e)}")
-                
-                # Speech recognition
-                try:
-                    transcript = await speech_recognizer.transcribe(processed_audio)
-                except Exception as e:
-                    raise TranscriptionError(f"Speech recognition failed: {str(e)}")
+            # Process audio and run speech recognition
+            processed_audio = await _stage("audio", audio_processor.process, audio_data)
+            try:
+                transcript = await _stage("transcription", speech_recognizer.transcribe, processed_audio)
+            finally:
+                audio_processor.release(processed_audio)
                 
-                if transcript.is_final:
-                    # Generate response using LLM
-                    try:
-                        response = await language_model.generate_response(
-                            transcript.text,
-                            session_id=session_id
-                        )
-                    except Exception as e:
-                        raise LLMError(f"Language model processing failed: {str(e)}")
-                    
-                    # Synthesize voice
-                    try:
-                        audio_response = await voice_synthesizer.synthesize(response)
-                    except Exception as e:
-                        raise VoiceSynthesisError(f"Voice synthesis failed: {str(e)}")
-                    
-                    # Send response back to client
+            if transcript.is_final:
+                cached_response = await _stage(
+                    "llm", language_model.cached_response, transcript.text, session_id=session_id
+                )
+                if cached_response is not None:
+                    # Known full text: synthesize() serves repeats from the TTS cache
+                    audio_response = await _stage("synthesis", voice_synthesizer.synthesize, cached_response)
                     await websocket.send_bytes(audio_response)
+                else:
+                    # Stream LLM output straight into synthesis and forward
+                    # audio chunks as soon as they are produced
+                    response_stream = _stage_stream(
+                        "llm", language_model.stream_response(transcript.text, session_id=session_id)
+                    )
+                    async for audio_chunk in _stage_stream(
+                        "synthesis", voice_synthesizer.synthesize_stream(response_stream)
+                    ):
+                        await websocket.send_bytes(audio_chunk)
                     
-                # Update session activity
-                session_manager.update_session(session_id)
+                # Mark the end of the response audio
+                await websocket.send_json({"type": "response_end"})
                 
-            except asyncio.TimeoutError:
-                logger.warning(f"Session {session_id} timed out")
-                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
-                break
+            # Update session activity
+            await session_manager.update_session(session_id)
                 
+    except WebSocketDisconnect as e:
+        # Normal hang-up: the socket is already closed, nothing to report
+        logger.info(f"Client disconnected from session {session_id} (code {e.code})")
+    except (AudioProcessingError, TranscriptionError, LLMError, VoiceSynthesisError) as e:
+        logger.error(f"Error in conversation: {str(e)}")
+        await _close_with_error(websocket, e)
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Error in conversation: {error_msg}")
-        try:
-            await websocket.send_json({"error": error_msg})
-            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
-        except:
-            pass
+        logger.error(f"Unexpected error in conversation: {str(e)}")
+        await _close_with_error(websocket, e)
     finally:
-        session_manager.end_session(session_id)
+        # Free history first so a session-store failure cannot leak it
+        language_model.clear_history(session_id)
+        await session_manager.end_session(session_id)
         # Cleanup any resources
         try:
             await websocket.close()
@@ -159,7 +218,7 @@ async def health_check():
             "language_model": language_model.health_check(),
             "voice_synthesis": voice_synthesizer.health_check(),
             "sessions": {
-                "active_sessions": session_manager.get_active_sessions_count()
+                "active_sessions": await session_manager.get_active_sessions_count()
             }
         }
         
@@ -191,18 +250,34 @@ async def voice_agent_exception_handler(request, exc):
 if __name__ == "__main__":
     import uvicorn
     
-    # Configure logging
-    logger.add(
-        "logs/voice_agent.log",
-        rotation="1 day",
-        retention="30 days",
-        level="INFO"
-    )
+    # One process per worker; WEB_CONCURRENCY defaults to the 2n+1 rule over
+    # the CPUs this process may run on (os.cpu_count() ignores cpusets)
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    workers = int(os.getenv("WEB_CONCURRENCY", cpus * 2 + 1))
+    
+    # Rotating file logs are only safe with a single process; with several
+    # workers each would rotate the same file, so logs go to stderr instead
+    if workers == 1:
+        logger.add(
+            "logs/voice_agent.log",
+            rotation="1 day",
+            retention="30 days",
+            level="INFO"
+        )
     
     uvicorn.run(
-        app,
+        "app:app",
         host="0.0.0.0",
         port=8000,
         log_level="info",
-        reload=True
+        workers=workers,
+        loop="auto",  # uvloop when installed (not on Windows), else asyncio
+        http="httptools",
+        ws="websockets",
+        ws_max_size=1024 * 1024,  # ~16s of 16 kHz mono float32 audio per frame
+        ws_ping_interval=20,
+        reload=False
     )
@@ -1,58 +1,172 @@
 import numpy as np
 from typing import Dict, Optional
-import sounddevice as sd
+from collections import OrderedDict, deque
+from pathlib import Path
+import ctypes
+import threading
 from loguru import logger
+from src.utils.config import AudioConfig
+
+class Float32Pool:
+    """Size-bucketed pool of reusable float32 buffers.
+    
+    Prewarmed sizes are always kept. Other sizes are pooled as they are
+    released, up to max_sizes buckets, evicting the least recently used.
+    """
+    
+    def __init__(self, max_per_size: int = 8, max_sizes: int = 8):
+        self.max_per_size = max_per_size
+        self.max_sizes = max_sizes
+        self._buckets: Dict[int, deque] = {}
+        self._dynamic_buckets: "OrderedDict[int, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def prewarm(self, size: int, count: int = 2):
+        """Register a standard buffer size and preallocate buffers for it."""
+        with self._lock:
+            bucket = self._dynamic_buckets.pop(size, None)
+            bucket = self._buckets.setdefault(size, bucket if bucket is not None else deque())
+            while len(bucket) < min(count, self.max_per_size):
+                bucket.append(np.empty(size, dtype=np.float32))
+                
+    def acquire(self, size: int) -> np.ndarray:
+        """Return a flat float32 buffer of the given size (contents undefined)."""
+        with self._lock:
+            bucket = self._buckets.get(size)
+            if bucket is None:
+                bucket = self._dynamic_buckets.get(size)
+                if bucket is not None:
+                    self._dynamic_buckets.move_to_end(size)
+            if bucket:
+                return bucket.pop()
+        return np.empty(size, dtype=np.float32)
+        
+    def release(self, buffer: np.ndarray):
+        """Return a buffer to the pool, adding a bucket for new sizes."""
+        base = buffer if buffer.base is None else buffer.base
+        if not isinstance(base, np.ndarray) or base.dtype != np.float32:
+            return
+        with self._lock:
+            bucket = self._buckets.get(base.size)
+            if bucket is None:
+                bucket = self._dynamic_buckets.get(base.size)
+                if bucket is None:
+                    if self.max_sizes <= 0:
+                        return
+                    if len(self._dynamic_buckets) >= self.max_sizes:
+                        self._dynamic_buckets.popitem(last=False)
+                    bucket = self._dynamic_buckets[base.size] = deque()
+                self._dynamic_buckets.move_to_end(base.size)
+            if len(bucket) >= self.max_per_size:
+                return
+            if not any(pooled is base for pooled in bucket):
+                bucket.append(base)
+
+buffer_pool = Float32Pool()
+
+def _load_native_kernel():
+    """Load the optional SIMD gate/AGC kernel built from audio_kernels.c."""
+    library_path = Path(__file__).with_name("_audio_kernels.so")
+    try:
+        library = ctypes.CDLL(str(library_path))
+    except OSError:
+        return None
+        
+    kernel = library.agc_gate_clip_f32
+    kernel.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_float, ctypes.c_float]
+    kernel.restype = None
+    logger.info("Using native audio kernel")
+    return kernel
+
+_native_gate_agc_clip = _load_native_kernel()
 
 class AudioProcessor:
-    def __init__(self, config: Dict):
-        self.sample_rate = config["sample_rate"]
-        self.channels = config["channels"]
-        self.chunk_size = config["chunk_size"]
-        self.buffer_size = config["buffer_size"]
+    def __init__(self, config: AudioConfig):
+        self.sample_rate = config.sample_rate
+        self.channels = config.channels
+        self.chunk_size = config.chunk_size
+        self.buffer_size = config.buffer_size
+        
+        # Processing constants as float32 scalars, so ufuncs stay in float32
+        self._noise_thr = np.float32(0.01)
+        self._target_rms = np.float32(0.2)
+        self._neg_one = np.float32(-1.0)
+        self._pos_one = np.float32(1.0)
+        
+        # Prewarm the buffer pool for the standard chunk and buffer sizes
+        self.pool = buffer_pool
+        self.pool.prewarm(self.chunk_size * self.channels)
+        self.pool.prewarm(self.buffer_size * self.channels)
+        
+        # Specialize per-chunk steps once, keeping branches off the hot path
+        if self.channels > 1:
+            channels = self.channels
+            self._reshape = lambda audio_array: audio_array.reshape(-1, channels)
+        else:
+            self._reshape = lambda audio_array: audio_array
+        self._gate_and_normalize = (
+            self._gate_and_normalize_native if _native_gate_agc_clip is not None
+            else self._gate_and_normalize_numpy
+        )
         
         # Initialize audio buffer
         self.buffer = np.zeros((self.buffer_size, self.channels))
         self.buffer_index = 0
         
     def process(self, audio_data: bytes) -> np.ndarray:
-        """Process incoming audio data."""
+        """Process incoming audio data.
+        
+        The returned array is borrowed from the buffer pool; hand it back
+        with release() once it is no longer needed.
+        """
         try:
-            # Convert bytes to numpy array
-            audio_array = np.frombuffer(audio_data, dtype=np.float32)
-            
-            # Reshape if stereo
-            if self.channels == 2:
-                audio_array = audio_array.reshape(-1, 2)
+            # Copy bytes into a pooled, writable buffer (frombuffer is read-only)
+            samples = np.frombuffer(audio_data, dtype=np.float32)
+            audio_array = self.pool.acquire(samples.size)
+            np.copyto(audio_array, samples)
             
-            # Apply noise reduction
-            processed_audio = self._reduce_noise(audio_array)
+            # Apply noise gate and automatic gain control in a single pass
+            self._gate_and_normalize(audio_array)
             
-            # Apply automatic gain control
-            processed_audio = self._apply_agc(processed_audio)
-            
-            return processed_audio
+            # Interleaved samples to (frames, channels) for multi-channel input
+            return self._reshape(audio_array)
             
         except Exception as e:
             logger.error(f"Error processing audio: {str(e)}")
             raise
             
-    def _reduce_noise(self, audio_array: np.ndarray) -> np.ndarray:
-        """Apply basic noise reduction."""
-        # Simple noise gate
-        noise_threshold = 0.01
-        audio_array[np.abs(audio_array) < noise_threshold] = 0
+    def _gate_and_normalize_native(self, audio_array: np.ndarray) -> np.ndarray:
+        """Apply noise gate, AGC and clipping in place using the native SIMD kernel."""
+        # Expects the flat contiguous float32 buffers handed out by the pool
+        _native_gate_agc_clip(
+            audio_array.ctypes.data, audio_array.size, self._noise_thr, self._target_rms
+        )
         return audio_array
         
-    def _apply_agc(self, audio_array: np.ndarray) -> np.ndarray:
-        """Apply Automatic Gain Control."""
-        target_rms = 0.2
-        current_rms = np.sqrt(np.mean(audio_array**2))
+    def _gate_and_normalize_numpy(self, audio_array: np.ndarray) -> np.ndarray:
+        """Apply noise gate, automatic gain control and clipping in place."""
+        # Simple noise gate: scale by a 0/1 keep-mask built in a pooled scratch buffer
+        scratch = self.pool.acquire(audio_array.size)
+        try:
+            np.abs(audio_array, out=scratch)
+            np.greater_equal(scratch, self._noise_thr, out=scratch)
+            np.multiply(audio_array, scratch, out=audio_array)
+        finally:
+            self.pool.release(scratch)
+        
+        # RMS of the gated signal, without materialising audio_array**2
+        sum_squares = np.einsum("i,i->", audio_array, audio_array)
+        current_rms = np.sqrt(sum_squares / audio_array.size) if audio_array.size else 0
         
         if current_rms > 0:
-            gain = target_rms / current_rms
-            audio_array = audio_array * gain
+            np.multiply(audio_array, self._target_rms / current_rms, out=audio_array)
             
-        return np.clip(audio_array, -1.0, 1.0)
+        np.clip(audio_array, self._neg_one, self._pos_one, out=audio_array)
+        return audio_array
+        
+    def release(self, audio_array: np.ndarray):
+        """Return an array produced by process() to the buffer pool."""
+        self.pool.release(audio_array)
         
     def get_stream_parameters(self) -> Dict:
         """Return audio stream parameters."""
@@ -64,5 +178,5 @@ class AudioProcessor:
         
     def reset(self):
         """Reset audio processor state."""
-        self.buffer = np.zeros((self.buffer_size, self.channels))
+        self.buffer.fill(0)
         self.buffer_index = 0
@@ -0,0 +1,115 @@
+/*
+ * Fused noise gate + automatic gain control + clip for float32 audio.
+ *
+ * Build (done by the Dockerfile):
+ *   gcc -O3 -shared -fPIC -o src/_audio_kernels.so src/audio_kernels.c -lm
+ *
+ * The AVX2/FMA path is compiled with a per-function target attribute and
+ * selected at runtime, so the library also loads on CPUs without AVX2 and
+ * on non-x86 machines (scalar path only).
+ */
+#include <math.h>
+#include <stddef.h>
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <immintrin.h>
+#define HAVE_X86 1
+#endif
+
+static double gate_sumsq_scalar(float *x, size_t n, float thr)
+{
+    double sumsq = 0.0;
+    for (size_t i = 0; i < n; i++) {
+        float v = x[i];
+        if (fabsf(v) < thr) {
+            v = 0.0f;
+            x[i] = v;
+        }
+        sumsq += (double)v * v;
+    }
+    return sumsq;
+}
+
+static void scale_clip_scalar(float *x, size_t n, float gain)
+{
+    for (size_t i = 0; i < n; i++) {
+        float v = x[i] * gain;
+        x[i] = v < -1.0f ? -1.0f : (v > 1.0f ? 1.0f : v);
+    }
+}
+
+#ifdef HAVE_X86
+__attribute__((target("avx2,fma")))
+static double gate_sumsq_avx2(float *x, size_t n, float thr)
+{
+    const __m256 sign_mask = _mm256_set1_ps(-0.0f);
+    const __m256 vthr = _mm256_set1_ps(thr);
+    __m256 acc = _mm256_setzero_ps();
+    size_t i = 0;
+
+    for (; i + 8 <= n; i += 8) {
+        __m256 v = _mm256_loadu_ps(x + i);
+        __m256 gated = _mm256_cmp_ps(_mm256_andnot_ps(sign_mask, v), vthr, _CMP_LT_OQ);
+        v = _mm256_andnot_ps(gated, v);
+        _mm256_storeu_ps(x + i, v);
+        acc = _mm256_fmadd_ps(v, v, acc);
+    }
+
+    __m128 sum = _mm_add_ps(_mm256_castps256_ps128(acc), _mm256_extractf128_ps(acc, 1));
+    sum = _mm_hadd_ps(sum, sum);
+    sum = _mm_hadd_ps(sum, sum);
+
+    return (double)_mm_cvtss_f32(sum) + gate_sumsq_scalar(x + i, n - i, thr);
+}
+
+__attribute__((target("avx2,fma")))
+static void scale_clip_avx2(float *x, size_t n, float gain)
+{
+    const __m256 vgain = _mm256_set1_ps(gain);
+    const __m256 lo = _mm256_set1_ps(-1.0f);
+    const __m256 hi = _mm256_set1_ps(1.0f);
+    size_t i = 0;
+
+    for (; i + 8 <= n; i += 8) {
+        __m256 v = _mm256_mul_ps(_mm256_loadu_ps(x + i), vgain);
+        /* min/max return the second operand on NaN: keep v second so NaN
+         * propagates like the scalar tail and np.clip */
+        _mm256_storeu_ps(x + i, _mm256_max_ps(lo, _mm256_min_ps(hi, v)));
+    }
+
+    scale_clip_scalar(x + i, n - i, gain);
+}
+#endif
+
+void agc_gate_clip_f32(float *x, size_t n, float thr, float target_rms)
+{
+    if (n == 0) {
+        return;
+    }
+
+#ifdef HAVE_X86
+    static int use_avx2 = -1;
+    if (use_avx2 < 0) {
+        __builtin_cpu_init();
+        use_avx2 = __builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma");
+    }
+#endif
+
+    double sumsq;
+#ifdef HAVE_X86
+    sumsq = use_avx2 ? gate_sumsq_avx2(x, n, thr) : gate_sumsq_scalar(x, n, thr);
+#else
+    sumsq = gate_sumsq_scalar(x, n, thr);
+#endif
+
+    float rms = (float)sqrt(sumsq / (double)n);
+    float gain = rms > 0.0f ? target_rms / rms : 1.0f;
+
+#ifdef HAVE_X86
+    if (use_avx2) {
+        scale_clip_avx2(x, n, gain);
+        return;
+    }
+#endif
+    scale_clip_scalar(x, n, gain);
+}
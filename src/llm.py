@@ -1,20 +1,60 @@
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
 import openai
+import httpx
 from loguru import logger
-import os
 import json
+from collections import OrderedDict, deque
+from itertools import chain
+from src.utils.cache import ResponseCache
+from src.utils.config import LLMConfig
+
+# Persistent system prompt. Kept as a single shared object so every request
+# starts with a byte-identical prefix, which lets the provider's automatic
+# prompt caching reuse the prefill across turns and sessions. Never mutate it.
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a helpful AI assistant engaged in a voice conversation. Keep your responses concise and natural."
+}
 
 class LanguageModel:
-    def __init__(self, config: Dict):
+    def __init__(self, config: LLMConfig, api_key: str):
         self.config = config
-        self.provider = config["default_provider"]
+        self.api_key = api_key
+        self.provider = config.default_provider
         self.is_initialized = False
-        self.conversation_history = {}
+        self.conversation_history: "OrderedDict[str, deque]" = OrderedDict()
+        self.max_sessions = config.max_sessions
+        self.client = None
+        
+        # Response cache for repeated utterances, shared across sessions
+        cache_config = config.cache
+        self.cache = ResponseCache(
+            max_entries=cache_config.max_entries
+        ) if cache_config.enabled else None
+        
+        # Request batching for generate_response, started in initialize()
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_worker_task: Optional[asyncio.Task] = None
+        self._session_tails: Dict[str, asyncio.Task] = {}
+        self._session_batches: Set[asyncio.Task] = set()
         
     async def initialize(self):
         """Initialize language model clients."""
         if self.provider == "openai":
-            openai.api_key = os.getenv("OPENAI_API_KEY")
+            # Pooled HTTP/2 client, reused across turns and sessions
+            self.client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+                    timeout=httpx.Timeout(30.0, connect=2.0)
+                )
+            )
+            
+        if self.config.batching.enabled:
+            self._batch_queue = asyncio.Queue()
+            self._batch_worker_task = asyncio.create_task(self._batch_worker())
         self.is_initialized = True
         
     async def generate_response(self, user_input: str, session_id: str) -> str:
@@ -22,38 +62,183 @@ class LanguageModel:
         if not self.is_initialized:
             raise RuntimeError("Language model not initialized")
             
+        if self._batch_queue is not None:
+            return await self._enqueue(user_input, session_id)
+        return await self._respond(user_input, session_id)
+        
+    async def _enqueue(self, user_input: str, session_id: str) -> str:
+        """Queue a request for the batch worker and wait for its response."""
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((user_input, session_id, future))
+        return await future
+        
+    async def _batch_worker(self):
+        """Collect queued requests into short windows and dispatch them concurrently."""
+        loop = asyncio.get_running_loop()
+        batching = self.config.batching
+        
+        while True:
+            batch = [await self._batch_queue.get()]
+            deadline = loop.time() + batching.max_wait_ms / 1000
+            try:
+                while len(batch) < batching.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._batch_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                self._fail_pending(batch)
+                raise
+                    
+            # One task per session: sessions run in parallel on the shared
+            # connection pool, requests within a session stay in order
+            by_session: Dict[str, List[Tuple[str, str, asyncio.Future]]] = {}
+            for item in batch:
+                by_session.setdefault(item[1], []).append(item)
+            for session_id, items in by_session.items():
+                previous = self._session_tails.get(session_id)
+                task = asyncio.create_task(self._run_session_batch(items, previous))
+                self._session_tails[session_id] = task
+                self._session_batches.add(task)
+                task.add_done_callback(self._session_batches.discard)
+                task.add_done_callback(lambda done, sid=session_id: self._forget_tail(sid, done))
+                # Runs even if the task is cancelled before it ever starts
+                task.add_done_callback(lambda done, items=items: self._fail_pending(items))
+                
+    async def _run_session_batch(self, items: List[Tuple[str, str, asyncio.Future]], previous: Optional[asyncio.Task]):
+        """Answer one session's batched requests in order, after its previous batch."""
+        if previous is not None:
+            await asyncio.wait([previous])
+            
+        for user_input, session_id, future in items:
+            if future.done():
+                continue
+            try:
+                response_text = await self._respond(user_input, session_id)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(response_text)
+            
+    @staticmethod
+    def _fail_pending(items: List[Tuple[str, str, asyncio.Future]]):
+        """Fail queued requests that will never be answered."""
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(RuntimeError("Language model closed"))
+                
+    def _forget_tail(self, session_id: str, task: asyncio.Task):
+        """Drop a finished session task unless a newer one has replaced it."""
+        if self._session_tails.get(session_id) is task:
+            del self._session_tails[session_id]
+            
+    async def _respond(self, user_input: str, session_id: str) -> str:
+        """Answer from the cache or the configured provider and record the turn."""
         try:
+            # Serve repeated utterances from the cache when the context matches
+            cache_state = self._conversation_state(session_id)
+            cached_response = self.cached_response(user_input, session_id)
+            if cached_response is not None:
+                return cached_response
+            
             if self.provider == "openai":
-                return await self._generate_openai_response(user_input, session_id)
+                response_text = await self._generate_openai_response(user_input, session_id)
             else:
                 raise ValueError(f"Unsupported provider: {self.provider}")
                 
+            self._record_turn(session_id, user_input, response_text)
+            if self.cache is not None:
+                self.cache.put(user_input, cache_state, response_text)
+                
+            return response_text
+                
         except Exception as e:
             logger.error(f"Response generation error: {str(e)}")
             raise
             
+    def cached_response(self, user_input: str, session_id: str) -> Optional[str]:
+        """Return the cached full response for a turn, recording the turn on a hit."""
+        if self.cache is None:
+            return None
+            
+        cached_response = self.cache.get(user_input, self._conversation_state(session_id))
+        if cached_response is not None:
+            logger.debug(f"Response cache hit for session {session_id}")
+            self._record_turn(session_id, user_input, cached_response)
+        return cached_response
+        
+    async def stream_response(self, user_input: str, session_id: str) -> AsyncIterator[str]:
+        """Stream response text deltas from the configured language model."""
+        if not self.is_initialized:
+            raise RuntimeError("Language model not initialized")
+            
+        try:
+            # Serve repeated utterances from the cache when the context matches
+            cache_state = self._conversation_state(session_id)
+            cached_response = self.cached_response(user_input, session_id)
+            if cached_response is not None:
+                yield cached_response
+                return
+            
+            if self.provider == "openai":
+                deltas = self._stream_openai_response(user_input, session_id)
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+                
+            parts = []
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+                
+            response_text = "".join(parts)
+            self._record_turn(session_id, user_input, response_text)
+            if self.cache is not None:
+                self.cache.put(user_input, cache_state, response_text)
+                
+        except Exception as e:
+            logger.error(f"Response streaming error: {str(e)}")
+            raise
+            
+    def _conversation_state(self, session_id: str) -> Tuple[Tuple[str, str], ...]:
+        """Return the full history sent to the model, as a cache key."""
+        # Anything shorter lets one session's answer leak into another's
+        history = self.conversation_history.get(session_id, ())
+        return tuple((message["role"], message["content"]) for message in history)
+        
+    def _record_turn(self, session_id: str, user_input: str, response_text: str):
+        """Append an exchange to the session history, keeping the last 5 exchanges."""
+        history = self.conversation_history.get(session_id)
+        if history is None:
+            # Bounded deque drops the oldest messages on append, no copying
+            history = self.conversation_history[session_id] = deque(maxlen=10)
+        self.conversation_history.move_to_end(session_id)
+        history.append({"role": "user", "content": user_input})
+        history.append({"role": "assistant", "content": response_text})
+        
+        # Evict the least recently active sessions beyond the cap
+        while len(self.conversation_history) > self.max_sessions:
+            self.conversation_history.popitem(last=False)
+            
     async def _generate_openai_response(self, user_input: str, session_id: str) -> str:
         """Generate response using OpenAI's API."""
         try:
             # Get conversation history for this session
-            history = self.conversation_history.get(session_id, [])
-            
-            # Prepare messages
-            messages = [
-                {"role": "system", "content": "You are a helpful AI assistant engaged in a voice conversation. Keep your responses concise and natural."}
-            ]
+            history = self.conversation_history.get(session_id, ())
             
-            # Add conversation history
-            messages.extend(history)
-            
-            # Add user's input
-            messages.append({"role": "user", "content": user_input})
+            # Persistent prefix (system prompt + history), then the new turn
+            user_message = {"role": "user", "content": user_input}
+            messages = list(chain((SYSTEM_MESSAGE,), history, (user_message,)))
             
             # Get model configuration
-            model_config = self.config["providers"]["openai"]
+            model_config = self.config.providers["openai"]
             
             # Generate response
-            response = await openai.ChatCompletion.acreate(
+            response = await self.client.chat.completions.create(
                 model=model_config["model"],
                 messages=messages,
                 temperature=model_config["temperature"],
@@ -63,22 +248,43 @@ class LanguageModel:
             # Extract response text
             response_text = response.choices[0].message.content
             
-            # Update conversation history
-            history.extend([
-                {"role": "user", "content": user_input},
-                {"role": "assistant", "content": response_text}
-            ])
+            return response_text
+            
+        except Exception as e:
+            logger.error(f"OpenAI response generation error: {str(e)}")
+            raise
+            
+    async def _stream_openai_response(self, user_input: str, session_id: str) -> AsyncIterator[str]:
+        """Stream response deltas using OpenAI's API."""
+        try:
+            # Get conversation history for this session
+            history = self.conversation_history.get(session_id, ())
             
-            # Trim history if too long
-            if len(history) > 10:  # Keep last 5 exchanges
-                history = history[-10:]
+            # Persistent prefix (system prompt + history), then the new turn
+            user_message = {"role": "user", "content": user_input}
+            messages = list(chain((SYSTEM_MESSAGE,), history, (user_message,)))
             
-            self.conversation_history[session_id] = history
+            # Get model configuration
+            model_config = self.config.providers["openai"]
             
-            return response_text
+            # Stream response
+            stream = await self.client.chat.completions.create(
+                model=model_config["model"],
+                messages=messages,
+                temperature=model_config["temperature"],
+                max_tokens=model_config["max_tokens"],
+                stream=True
+            )
             
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+                    
         except Exception as e:
-            logger.error(f"OpenAI response generation error: {str(e)}")
+            logger.error(f"OpenAI response streaming error: {str(e)}")
             raise
             
     def clear_history(self, session_id: str):
@@ -86,6 +292,27 @@ class LanguageModel:
         if session_id in self.conversation_history:
             del self.conversation_history[session_id]
             
+    async def close(self):
+        """Close language model clients."""
+        if self._batch_worker_task is not None:
+            # Stop collecting, cancel every session batch (not just the latest
+            # per session), then fail anything still queued so no caller waits forever
+            self._batch_worker_task.cancel()
+            batches = list(self._session_batches)
+            for task in batches:
+                task.cancel()
+            await asyncio.gather(self._batch_worker_task, *batches, return_exceptions=True)
+            self._batch_worker_task = None
+            
+            pending = []
+            while not self._batch_queue.empty():
+                pending.append(self._batch_queue.get_nowait())
+            self._fail_pending(pending)
+            self._batch_queue = None
+            
+        if self.client is not None:
+            await self.client.close()
+            
     def health_check(self) -> Dict:
         """Check the health of the language model service."""
         return {
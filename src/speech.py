@@ -4,7 +4,7 @@ from deepgram import Deepgram
 import numpy as np
 from dataclasses import dataclass
 from loguru import logger
-import os
+from src.utils.config import SpeechRecognitionConfig
 
 @dataclass
 class TranscriptionResult:
@@ -14,16 +14,17 @@ class TranscriptionResult:
     language: str
 
 class SpeechRecognizer:
-    def __init__(self, config: Dict):
+    def __init__(self, config: SpeechRecognitionConfig, api_key: str):
         self.config = config
-        self.provider = config["default_provider"]
+        self.api_key = api_key
+        self.provider = config.default_provider
         self.deepgram_client = None
         self.is_initialized = False
         
     async def initialize(self):
         """Initialize speech recognition clients."""
         if self.provider == "deepgram":
-            self.deepgram_client = Deepgram(os.getenv("DEEPGRAM_API_KEY"))
+            self.deepgram_client = Deepgram(self.api_key)
         self.is_initialized = True
             
     async def transcribe(self, audio_data: np.ndarray) -> TranscriptionResult:
@@ -48,12 +49,13 @@ class SpeechRecognizer:
             audio_bytes = (audio_data * 32767).astype(np.int16).tobytes()
             
             # Get transcription options from config
+            deepgram_config = self.config.providers["deepgram"]
             options = {
-                "model": self.config["providers"]["deepgram"]["model"],
-                "language": self.config["providers"]["deepgram"]["language"],
-                "interim_results": self.config["providers"]["deepgram"]["interim_results"],
-                "punctuate": self.config["providers"]["deepgram"]["punctuate"],
-                "diarize": self.config["providers"]["deepgram"]["diarize"]
+                "model": deepgram_config["model"],
+                "language": deepgram_config["language"],
+                "interim_results": deepgram_config["interim_results"],
+                "punctuate": deepgram_config["punctuate"],
+                "diarize": deepgram_config["diarize"]
             }
             
             # Send audio to Deepgram
@@ -69,7 +71,7 @@ class SpeechRecognizer:
                 text=result["transcript"],
                 is_final=True,  # For pre-recorded audio, always final
                 confidence=result["confidence"],
-                language=self.config["providers"]["deepgram"]["language"]
+                language=deepgram_config["language"]
             )
             
         except Exception as e:
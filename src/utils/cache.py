@@ -0,0 +1,42 @@
+import re
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+class ResponseCache:
+    """LRU response cache keyed on the normalized utterance and conversation state."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], str]" = OrderedDict()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Lowercase and strip punctuation and repeated whitespace."""
+        return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+    def get(self, text: str, state: Hashable) -> Optional[str]:
+        """Return a cached response for text under the given state, if any.
+
+        Only exact matches after normalization hit: any fuzzy similarity
+        treats "not happy" / "happy" or "$100" / "$900" as the same request.
+        """
+        key = (state, self._normalize(text))
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def put(self, text: str, state: Hashable, response: str):
+        """Store a response, evicting the least recently used entry if full."""
+        key = (state, self._normalize(text))
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
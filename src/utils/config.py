@@ -1,6 +1,154 @@
 import yaml
 from typing import Dict, Any
 from pathlib import Path
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pydantic import BaseSettings, SecretStr, validator
+
+# Prefer the libyaml C binding when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+@dataclass(frozen=True)
+class AudioConfig:
+    sample_rate: int
+    channels: int
+    chunk_size: int
+    buffer_size: int
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AudioConfig":
+        """Build from the `audio` config section."""
+        return cls(
+            sample_rate=int(data["sample_rate"]),
+            channels=int(data["channels"]),
+            chunk_size=int(data["chunk_size"]),
+            buffer_size=int(data["buffer_size"])
+        )
+
+@dataclass(frozen=True)
+class SpeechRecognitionConfig:
+    default_provider: str
+    providers: Dict[str, Dict] = field(default_factory=dict)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SpeechRecognitionConfig":
+        """Build from the `speech_recognition` config section."""
+        return cls(
+            default_provider=data["default_provider"],
+            providers=data.get("providers", {})
+        )
+
+@dataclass(frozen=True)
+class ResponseCacheConfig:
+    enabled: bool = False
+    max_entries: int = 256
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ResponseCacheConfig":
+        """Build from the `llm.cache` config section."""
+        return cls(
+            enabled=bool(data.get("enabled", False)),
+            max_entries=int(data.get("max_entries", 256))
+        )
+
+@dataclass(frozen=True)
+class BatchingConfig:
+    enabled: bool = False
+    max_batch_size: int = 8
+    max_wait_ms: float = 3.0
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BatchingConfig":
+        """Build from the `llm.batching` config section."""
+        return cls(
+            enabled=bool(data.get("enabled", False)),
+            max_batch_size=int(data.get("max_batch_size", 8)),
+            max_wait_ms=float(data.get("max_wait_ms", 3.0))
+        )
+
+@dataclass(frozen=True)
+class LLMConfig:
+    default_provider: str
+    providers: Dict[str, Dict] = field(default_factory=dict)
+    max_sessions: int = 1000
+    cache: ResponseCacheConfig = field(default_factory=ResponseCacheConfig)
+    batching: BatchingConfig = field(default_factory=BatchingConfig)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LLMConfig":
+        """Build from the `llm` config section."""
+        return cls(
+            default_provider=data["default_provider"],
+            providers=data.get("providers", {}),
+            max_sessions=int(data.get("max_sessions", 1000)),
+            cache=ResponseCacheConfig.from_dict(data.get("cache", {})),
+            batching=BatchingConfig.from_dict(data.get("batching", {}))
+        )
+
+@dataclass(frozen=True)
+class AudioCacheConfig:
+    enabled: bool = False
+    max_entries: int = 1024
+    max_disk_entries: int = 4096
+    directory: str = "~/.cache/voice_agent/tts"
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AudioCacheConfig":
+        """Build from the `voice.cache` config section."""
+        return cls(
+            enabled=bool(data.get("enabled", False)),
+            max_entries=int(data.get("max_entries", 1024)),
+            max_disk_entries=int(data.get("max_disk_entries", 4096)),
+            directory=str(data.get("directory", "~/.cache/voice_agent/tts"))
+        )
+
+@dataclass(frozen=True)
+class VoiceConfig:
+    default_provider: str
+    providers: Dict[str, Dict] = field(default_factory=dict)
+    cache: AudioCacheConfig = field(default_factory=AudioCacheConfig)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "VoiceConfig":
+        """Build from the `voice` config section."""
+        return cls(
+            default_provider=data["default_provider"],
+            providers=data.get("providers", {}),
+            cache=AudioCacheConfig.from_dict(data.get("cache", {}))
+        )
+
+# Service behind each required API key, for error messages
+API_KEY_SERVICES = {
+    "retell_api_key": "Retell.ai",
+    "openai_api_key": "OpenAI",
+    "deepgram_api_key": "Deepgram",
+    "elevenlabs_api_key": "ElevenLabs"
+}
+
+class Secrets(BaseSettings):
+    """Required API keys, read and validated from the environment in one step."""
+    
+    retell_api_key: SecretStr
+    openai_api_key: SecretStr
+    deepgram_api_key: SecretStr
+    elevenlabs_api_key: SecretStr
+    
+    @validator("*")
+    def _not_empty(cls, value: SecretStr) -> SecretStr:
+        """Reject keys that are set but empty."""
+        if not value.get_secret_value():
+            raise ValueError("must not be empty")
+        return value
+
+@lru_cache(maxsize=None)
+def _load(path: str = "config.yaml") -> Dict:
+    """Read and parse a YAML config file once per process."""
+    config_path = Path(path)
+    if not config_path.exists():
+        raise FileNotFoundError(f"{path} not found")
+        
+    with open(config_path, "r") as f:
+        return yaml.load(f, Loader=YAML_LOADER)
 
 class Config:
     _instance = None
@@ -13,12 +161,7 @@ class Config:
         
     def _load_config(self):
         """Load configuration from yaml file."""
-        config_path = Path("config.yaml")
-        if not config_path.exists():
-            raise FileNotFoundError("config.yaml not found")
-            
-        with open(config_path, "r") as f:
-            self._config = yaml.safe_load(f)
+        self._config = _load("config.yaml")
             
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value by key."""
@@ -1,48 +1,147 @@
 import uuid
+import time
 from typing import Dict, Optional
-from datetime import datetime, timedelta
 from loguru import logger
+import redis.asyncio as redis
 
 class SessionManager:
+    """In-memory session manager; timestamps are time.monotonic_ns() ticks."""
+    
     def __init__(self):
         self.sessions: Dict[str, Dict] = {}
         
-    def create_session(self) -> str:
+    async def create_session(self) -> str:
         """Create a new session and return session ID."""
-        session_id = str(uuid.uuid4())
+        session_id = uuid.uuid4().hex
+        now = time.monotonic_ns()
         self.sessions[session_id] = {
-            "created_at": datetime.now(),
-            "last_activity": datetime.now(),
+            "created_at": now,
+            "last_activity": now,
             "is_active": True
         }
         return session_id
         
-    def update_session(self, session_id: str):
+    async def update_session(self, session_id: str):
         """Update session last activity time."""
-        if session_id in self.sessions:
-            self.sessions[session_id]["last_activity"] = datetime.now()
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session["last_activity"] = time.monotonic_ns()
             
-    def end_session(self, session_id: str):
+    async def end_session(self, session_id: str):
         """End a session."""
         if session_id in self.sessions:
             self.sessions[session_id]["is_active"] = False
             logger.info(f"Session ended: {session_id}")
             
-    def cleanup_inactive_sessions(self, max_age_minutes: int = 30):
+    async def cleanup_inactive_sessions(self, max_age_minutes: int = 30):
         """Remove inactive sessions older than max_age_minutes."""
-        current_time = datetime.now()
+        current_ns = time.monotonic_ns()
+        max_age_ns = max_age_minutes * 60 * 1_000_000_000
         sessions_to_remove = []
         
         for session_id, session_data in self.sessions.items():
             if not session_data["is_active"]:
-                age = current_time - session_data["last_activity"]
-                if age > timedelta(minutes=max_age_minutes):
+                if current_ns - session_data["last_activity"] > max_age_ns:
                     sessions_to_remove.append(session_id)
                     
         for session_id in sessions_to_remove:
             del self.sessions[session_id]
             logger.info(f"Removed inactive session: {session_id}")
             
-    def get_active_sessions_count(self) -> int:
+    async def get_active_sessions_count(self) -> int:
         """Return the number of active sessions."""
         return sum(1 for session in self.sessions.values() if session["is_active"])
+        
+    async def close(self):
+        """Release session storage resources."""
+        pass
+
+class RedisSessionManager(SessionManager):
+    """Session manager backed by Redis, shared by all worker processes.
+    
+    Active sessions are tracked in a sorted set scored by last activity, so
+    sessions whose process died without ending them age out after the TTL.
+    """
+    
+    ACTIVE_SESSIONS_KEY = "sessions:active"
+    
+    # Refresh only sessions that still exist, so an expired one is not
+    # recreated as a stub hash; returns 0 if the session is gone
+    _UPDATE_SCRIPT = """
+    if redis.call('EXPIRE', KEYS[1], ARGV[1]) == 0 then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], 'last_activity', ARGV[2])
+    if redis.call('HGET', KEYS[1], 'is_active') == '1' then
+        redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+    end
+    return 1
+    """
+    
+    # Always drop the session from the active set; mark its hash inactive
+    # only if it still exists and was active
+    _END_SCRIPT = """
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    if redis.call('HGET', KEYS[1], 'is_active') == '1' then
+        redis.call('HSET', KEYS[1], 'is_active', 0)
+        return 1
+    end
+    return 0
+    """
+    
+    def __init__(self, redis_url: str, session_ttl: int = 1800):
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.session_ttl = session_ttl
+        self._update_script = self.redis.register_script(self._UPDATE_SCRIPT)
+        self._end_script = self.redis.register_script(self._END_SCRIPT)
+        
+    @staticmethod
+    def _key(session_id: str) -> str:
+        """Return the Redis key for a session."""
+        return f"session:{session_id}"
+        
+    async def create_session(self) -> str:
+        """Create a new session and return session ID."""
+        session_id = uuid.uuid4().hex
+        key = self._key(session_id)
+        now = time.time()
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"created_at": now, "last_activity": now, "is_active": 1})
+            pipe.expire(key, self.session_ttl)
+            pipe.zadd(self.ACTIVE_SESSIONS_KEY, {session_id: now})
+            await pipe.execute()
+        return session_id
+        
+    async def update_session(self, session_id: str):
+        """Update session last activity time and extend its expiry."""
+        await self._update_script(
+            keys=[self._key(session_id), self.ACTIVE_SESSIONS_KEY],
+            args=[self.session_ttl, time.time(), session_id]
+        )
+            
+    async def end_session(self, session_id: str):
+        """End a session; Redis expires its record after the TTL."""
+        ended = await self._end_script(
+            keys=[self._key(session_id), self.ACTIVE_SESSIONS_KEY],
+            args=[session_id]
+        )
+        if ended:
+            logger.info(f"Session ended: {session_id}")
+        
+    async def cleanup_inactive_sessions(self, max_age_minutes: int = 30):
+        """No-op: Redis expires idle sessions via their TTL."""
+        pass
+        
+    async def get_active_sessions_count(self) -> int:
+        """Return the number of active sessions across all workers."""
+        # Drop sessions idle past the TTL, e.g. from killed workers
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.ACTIVE_SESSIONS_KEY, "-inf", time.time() - self.session_ttl)
+            pipe.zcard(self.ACTIVE_SESSIONS_KEY)
+            _, count = await pipe.execute()
+        return count
+        
+    async def close(self):
+        """Close the Redis connection pool."""
+        await self.redis.close()
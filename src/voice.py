@@ -1,19 +1,47 @@
-from typing import Dict, Optional
-import elevenlabs
+from typing import AsyncIterator, Dict, Optional
+import asyncio
+import base64
+import httpx
+import websockets
 import numpy as np
 from loguru import logger
 import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from src.utils.config import VoiceConfig
 
 class VoiceSynthesizer:
-    def __init__(self, config: Dict):
+    def __init__(self, config: VoiceConfig, api_key: str):
         self.config = config
-        self.provider = config["default_provider"]
+        self.provider = config.default_provider
         self.is_initialized = False
+        self.api_key = api_key
+        self.http_client = None
+        
+        # Content-addressed cache of synthesized audio (memory, then disk).
+        # Only entries reused at least once are persisted to disk.
+        cache_config = config.cache
+        self.cache_enabled = cache_config.enabled
+        self.cache_max_entries = cache_config.max_entries
+        self.cache_max_disk_entries = cache_config.max_disk_entries
+        self.cache_dir = Path(cache_config.directory).expanduser()
+        self._audio_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._persisted_keys = set()
         
     async def initialize(self):
         """Initialize voice synthesis clients."""
         if self.provider == "elevenlabs":
-            elevenlabs.set_api_key(os.getenv("ELEVENLABS_API_KEY"))
+            # Pooled async HTTP client, reused for every synthesis request
+            self.http_client = httpx.AsyncClient(
+                base_url="https://api.elevenlabs.io/v1",
+                headers={"xi-api-key": self.api_key},
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+                timeout=httpx.Timeout(30.0, connect=2.0)
+            )
         self.is_initialized = True
         
     async def synthesize(self, text: str) -> bytes:
@@ -31,27 +59,214 @@ class VoiceSynthesizer:
             logger.error(f"Voice synthesis error: {str(e)}")
             raise
             
+    async def synthesize_stream(self, text_stream: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        """Synthesize streamed text to speech, yielding audio chunks as they arrive."""
+        if not self.is_initialized:
+            raise RuntimeError("Voice synthesizer not initialized")
+            
+        try:
+            if self.provider == "elevenlabs":
+                async for chunk in self._stream_elevenlabs(text_stream):
+                    yield chunk
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+                
+        except Exception as e:
+            logger.error(f"Voice stream synthesis error: {str(e)}")
+            raise
+            
+    def _elevenlabs_params(self) -> Dict:
+        """Return the ElevenLabs voice parameters from configuration."""
+        voice_config = self.config.providers["elevenlabs"]
+        return {
+            "voice": voice_config["voice_id"],
+            "model": "eleven_monolingual_v1",
+            "stability": voice_config["stability"],
+            "similarity_boost": voice_config["similarity_boost"]
+        }
+        
     async def _synthesize_elevenlabs(self, text: str) -> bytes:
         """Synthesize text using ElevenLabs API."""
         try:
             # Get voice configuration
-            voice_config = self.config["providers"]["elevenlabs"]
+            params = self._elevenlabs_params()
+            
+            # Serve repeated phrases from the cache
+            cache_key = self._cache_key(text, params)
+            audio = await self._cache_get(cache_key)
+            if audio is not None:
+                return audio
             
             # Generate audio
-            audio = elevenlabs.generate(
-                text=text,
-                voice=voice_config["voice_id"],
-                model="eleven_monolingual_v1",
-                stability=voice_config["stability"],
-                similarity_boost=voice_config["similarity_boost"]
+            response = await self.http_client.post(
+                f"/text-to-speech/{params['voice']}",
+                json={
+                    "text": text,
+                    "model_id": params["model"],
+                    "voice_settings": {
+                        "stability": params["stability"],
+                        "similarity_boost": params["similarity_boost"]
+                    }
+                },
+                headers={"Accept": "audio/mpeg"}
             )
+            response.raise_for_status()
+            audio = response.content
             
+            await self._cache_put(cache_key, audio)
             return audio
             
         except Exception as e:
             logger.error(f"ElevenLabs synthesis error: {str(e)}")
             raise
             
+    async def _stream_elevenlabs(self, text_stream: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        """Synthesize streamed text using the ElevenLabs input-streaming websocket."""
+        params = self._elevenlabs_params()
+        url = (
+            f"wss://api.elevenlabs.io/v1/text-to-speech/{params['voice']}"
+            f"/stream-input?model_id={params['model']}"
+        )
+        text_parts = []
+        audio_parts = []
+        
+        try:
+            async with websockets.connect(
+                url,
+                extra_headers={"xi-api-key": self.api_key},
+                max_size=None
+            ) as ws:
+                await ws.send(json.dumps({
+                    "text": " ",
+                    "voice_settings": {
+                        "stability": params["stability"],
+                        "similarity_boost": params["similarity_boost"]
+                    }
+                }))
+                
+                async def send_text():
+                    try:
+                        async for delta in text_stream:
+                            text_parts.append(delta)
+                            await ws.send(json.dumps({"text": delta, "try_trigger_generation": True}))
+                        await ws.send(json.dumps({"text": ""}))
+                    except Exception:
+                        # Unblock the receive loop; the error is re-raised below
+                        await ws.close()
+                        raise
+                        
+                # Feed text while audio is received, so synthesis overlaps generation
+                sender = asyncio.create_task(send_text())
+                try:
+                    async for message in ws:
+                        data = json.loads(message)
+                        if data.get("audio"):
+                            chunk = base64.b64decode(data["audio"])
+                            audio_parts.append(chunk)
+                            yield chunk
+                        if data.get("isFinal"):
+                            break
+                    await sender
+                finally:
+                    if not sender.done():
+                        sender.cancel()
+                        
+            # Make the complete utterance available to synthesize()
+            if text_parts and audio_parts:
+                await self._cache_put(self._cache_key("".join(text_parts), params), b"".join(audio_parts))
+            
+        except Exception as e:
+            logger.error(f"ElevenLabs stream synthesis error: {str(e)}")
+            raise
+            
+    def _cache_key(self, text: str, params: Dict) -> str:
+        """Return a content hash of the text and voice parameters."""
+        payload = json.dumps([self.provider, params, text], sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+        
+    async def _cache_get(self, key: str) -> Optional[bytes]:
+        """Look up cached audio in memory, then on disk."""
+        if not self.cache_enabled:
+            return None
+            
+        audio = self._audio_cache.get(key)
+        if audio is not None:
+            self._audio_cache.move_to_end(key)
+            # Reused phrase: persist it for other workers and restarts
+            if key not in self._persisted_keys:
+                await self._persist(key, audio)
+            return audio
+            
+        # Disk work runs in a worker thread to keep the event loop free
+        try:
+            audio = await asyncio.to_thread(self._read_cache_file, key)
+        except OSError:
+            return None
+            
+        self._remember(key, audio)
+        self._persisted_keys.add(key)
+        return audio
+        
+    async def _cache_put(self, key: str, audio: bytes):
+        """Store freshly synthesized audio in the in-memory cache."""
+        if not self.cache_enabled or not isinstance(audio, bytes):
+            return
+            
+        self._remember(key, audio)
+        
+    async def _persist(self, key: str, audio: bytes):
+        """Write a hot entry to the disk cache."""
+        self._persisted_keys.add(key)
+        try:
+            await asyncio.to_thread(self._write_cache_file, key, audio)
+        except OSError as e:
+            logger.warning(f"Failed to persist TTS cache entry: {str(e)}")
+            
+    def _read_cache_file(self, key: str) -> bytes:
+        """Read a disk cache entry and mark it as recently used."""
+        path = self.cache_dir / f"{key}.bin"
+        audio = path.read_bytes()
+        os.utime(path)
+        return audio
+        
+    def _write_cache_file(self, key: str, audio: bytes):
+        """Atomically write a disk cache entry, then prune the oldest beyond the cap."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_path.write_bytes(audio)
+        tmp_path.replace(self.cache_dir / f"{key}.bin")
+        self._prune_disk_cache()
+        
+    def _prune_disk_cache(self):
+        """Delete least recently used disk entries beyond max_disk_entries."""
+        entries = []
+        for path in self.cache_dir.glob("*.bin"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+                
+        if len(entries) <= self.cache_max_disk_entries:
+            return
+            
+        entries.sort()
+        for _, path in entries[:len(entries) - self.cache_max_disk_entries]:
+            # Another worker may already have removed it
+            path.unlink(missing_ok=True)
+            
+    def _remember(self, key: str, audio: bytes):
+        """Store audio in the in-memory LRU cache."""
+        self._audio_cache[key] = audio
+        self._audio_cache.move_to_end(key)
+        while len(self._audio_cache) > self.cache_max_entries:
+            evicted_key, _ = self._audio_cache.popitem(last=False)
+            self._persisted_keys.discard(evicted_key)
+            
+    async def close(self):
+        """Close voice synthesis clients."""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            
     def health_check(self) -> Dict:
         """Check the health of the voice synthesis service."""
         return {
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import websockets
 import sounddevice as sd
 import numpy as np
@@ -6,6 +7,11 @@ from typing import Optional
 import click
 import sys
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 async def record_audio(duration: float = 0.5, sample_rate: int = 16000) -> np.ndarray:
     """Record audio from microphone."""
     audio_data = sd.rec(
@@ -26,7 +32,8 @@ async def play_audio(audio_data: bytes, sample_rate: int = 16000):
 async def main(server_url: str = "ws://localhost:8000/ws/conversation"):
     """Main client function."""
     try:
-        async with websockets.connect(server_url) as websocket:
+        # Audio is sent as binary frames, so skip compression and size caps
+        async with websockets.connect(server_url, compression=None, max_size=None) as websocket:
             print("Connected to voice agent server")
             print("Press Enter to start speaking (q + Enter to quit)")
             
@@ -41,13 +48,23 @@ async def main(server_url: str = "ws://localhost:8000/ws/conversation"):
                 # Send audio to server
                 await websocket.send(audio_data.tobytes())
                 
-                # Receive response
+                # Receive streamed response audio until the end marker
                 print("Waiting for response...")
-                response = await websocket.recv()
+                chunks = []
+                while True:
+                    message = await websocket.recv()
+                    if isinstance(message, bytes):
+                        chunks.append(message)
+                        continue
+                    event = json.loads(message)
+                    if "error" in event:
+                        print(f"Server error: {event['error']}")
+                    break
                 
                 # Play response
-                print("Playing response...")
-                await play_audio(response)
+                if chunks:
+                    print("Playing response...")
+                    await play_audio(b"".join(chunks))
                 
     except websockets.exceptions.ConnectionClosed:
         print("Connection to server closed")
@@ -58,6 +75,9 @@ async def main(server_url: str = "ws://localhost:8000/ws/conversation"):
 @click.option('--server', default="ws://localhost:8000/ws/conversation", help='WebSocket server URL')
 def run(server):
     """Run the test client."""
+    if uvloop is not None:
+        uvloop.install()
+        
     try:
         asyncio.run(main(server))
     except KeyboardInterrupt:
@@ -0,0 +1,57 @@
+import ctypes
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import src.audio as audio
+from src.utils.config import AudioConfig
+
+KERNEL_SOURCE = Path(audio.__file__).with_name("audio_kernels.c")
+
+@pytest.fixture(scope="module")
+def native_kernel(tmp_path_factory):
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc is not available")
+    library_path = tmp_path_factory.mktemp("kernels") / "_audio_kernels.so"
+    subprocess.run(
+        ["gcc", "-O3", "-shared", "-fPIC", "-o", str(library_path), str(KERNEL_SOURCE), "-lm"],
+        check=True
+    )
+    kernel = ctypes.CDLL(str(library_path)).agc_gate_clip_f32
+    kernel.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_float, ctypes.c_float]
+    kernel.restype = None
+    return kernel
+
+@pytest.fixture
+def processor(native_kernel, monkeypatch):
+    monkeypatch.setattr(audio, "_native_gate_agc_clip", native_kernel)
+    return audio.AudioProcessor(
+        AudioConfig(sample_rate=16000, channels=1, chunk_size=1024, buffer_size=4096)
+    )
+
+def _signal(size, seed):
+    rng = np.random.default_rng(seed)
+    # Mix of gated (< 0.01), normal and clipping-after-gain samples
+    return (rng.standard_normal(size) * rng.choice([0.005, 0.1, 2.0], size)).astype(np.float32)
+
+def _assert_paths_agree(processor, samples):
+    native = processor._gate_and_normalize_native(samples.copy())
+    numpy = processor._gate_and_normalize_numpy(samples.copy())
+    np.testing.assert_allclose(native, numpy, rtol=1e-5, atol=1e-7, equal_nan=True)
+
+@pytest.mark.parametrize("size", [0, 1, 7, 8, 9, 1024])
+def test_native_kernel_matches_numpy(processor, size):
+    _assert_paths_agree(processor, _signal(size, size))
+
+@pytest.mark.parametrize("size", [1, 7, 8, 9, 1024])
+def test_native_kernel_matches_numpy_with_nan(processor, size):
+    samples = _signal(size, size)
+    samples[::3] = np.nan
+    _assert_paths_agree(processor, samples)
+
+def test_native_kernel_matches_numpy_on_silence(processor):
+    _assert_paths_agree(processor, np.zeros(1024, dtype=np.float32))
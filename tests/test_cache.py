@@ -0,0 +1,121 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.cache import ResponseCache
+from src.utils.config import LLMConfig
+
+@pytest.mark.parametrize("cached, asked", [
+    ("I am happy with the service I received today",
+     "I am not happy with the service I received today"),
+    ("Please transfer 100 dollars from my checking account to John Smith",
+     "Please transfer 900 dollars from my checking account to John Smith"),
+    ("Remind me to call the dentist tomorrow at 3 pm",
+     "Remind me to call the dentist tomorrow at 5 pm"),
+    ("Book me a flight to Boston on Monday",
+     "Book me a flight to Boston on Sunday"),
+])
+def test_near_duplicates_with_different_meaning_miss(cached, asked):
+    cache = ResponseCache()
+    cache.put(cached, 0, "cached answer")
+    assert cache.get(asked, 0) is None
+
+def test_exact_match_after_normalization_hits():
+    cache = ResponseCache()
+    cache.put("What time is it?", 0, "It's noon.")
+    assert cache.get("  what TIME is it ", 0) == "It's noon."
+
+def test_conversation_state_must_match():
+    cache = ResponseCache()
+    cache.put("yes", 1, "Great, booked.")
+    assert cache.get("yes", 2) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 0, "A")
+    cache.put("b", 0, "B")
+    assert cache.get("a", 0) == "A"
+    cache.put("c", 0, "C")
+    assert len(cache) == 2
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == "A"
+
+class FakeCompletions:
+    """Scripted chat completions that answer from the messages they are sent."""
+    
+    def __init__(self):
+        self.calls = 0
+        
+    async def create(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        text = self._answer(messages)
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return self._stream(text)
+        
+    @staticmethod
+    def _answer(messages):
+        user_input = messages[-1]["content"]
+        if user_input.startswith("my name is"):
+            return "okay"
+        if user_input == "okay":
+            return "Great!"
+        for message in messages:
+            match = re.match(r"my name is (\w+)", message["content"])
+            if match:
+                return f"Your name is {match.group(1)}."
+        return "I don't know."
+        
+    @staticmethod
+    async def _stream(text):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+def _language_model():
+    pytest.importorskip("openai")
+    pytest.importorskip("httpx")
+    from src.llm import LanguageModel
+    
+    language_model = LanguageModel(
+        LLMConfig.from_dict({
+            "default_provider": "openai",
+            "providers": {"openai": {"model": "gpt-4", "temperature": 0.7, "max_tokens": 150}},
+            "cache": {"enabled": True}
+        }),
+        api_key="test"
+    )
+    completions = FakeCompletions()
+    language_model.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    language_model.is_initialized = True
+    return language_model, completions
+
+async def _converse(language_model, session_id, turns):
+    responses = []
+    for user_input in turns:
+        parts = [delta async for delta in language_model.stream_response(user_input, session_id)]
+        responses.append("".join(parts))
+    return responses
+
+def test_cached_response_never_crosses_conversations():
+    language_model, _ = _language_model()
+    
+    async def run():
+        bob = await _converse(language_model, "a", ["my name is Bob", "okay", "what is my name"])
+        alice = await _converse(language_model, "c", ["my name is Alice", "okay", "what is my name"])
+        return bob, alice
+        
+    bob, alice = asyncio.run(run())
+    assert bob == ["okay", "Great!", "Your name is Bob."]
+    assert alice == ["okay", "Great!", "Your name is Alice."]
+
+def test_first_turn_is_shared_across_sessions():
+    language_model, completions = _language_model()
+    
+    async def run():
+        first = await _converse(language_model, "a", ["okay"])
+        second = await _converse(language_model, "b", ["okay"])
+        return first, second
+        
+    assert asyncio.run(run()) == (["Great!"], ["Great!"])
+    assert completions.calls == 1
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from src.utils.config import LLMConfig
+
+pytest.importorskip("openai")
+pytest.importorskip("httpx")
+
+from src.llm import LanguageModel
+
+def _language_model(max_batch_size=8, max_wait_ms=3.0):
+    # Non-openai provider: initialize() starts the batch worker without a client
+    return LanguageModel(
+        LLMConfig.from_dict({
+            "default_provider": "test",
+            "batching": {
+                "enabled": True,
+                "max_batch_size": max_batch_size,
+                "max_wait_ms": max_wait_ms
+            }
+        }),
+        api_key="test"
+    )
+
+def test_requests_within_a_session_run_in_order_across_batches():
+    language_model = _language_model(max_batch_size=2)
+    started, active = [], []
+
+    async def respond(user_input, session_id):
+        assert not active, "requests of one session overlapped"
+        active.append(user_input)
+        started.append(user_input)
+        # Earlier requests take longer, so any reordering would show up
+        await asyncio.sleep(0.01 * (5 - int(user_input)))
+        active.remove(user_input)
+        return f"answer {user_input}"
+
+    async def run():
+        await language_model.initialize()
+        language_model._respond = respond
+        try:
+            return await asyncio.gather(
+                *(language_model.generate_response(str(i), "a") for i in range(5))
+            )
+        finally:
+            await language_model.close()
+
+    assert asyncio.run(run()) == [f"answer {i}" for i in range(5)]
+    assert started == [str(i) for i in range(5)]
+
+def test_sessions_in_a_batch_run_in_parallel():
+    language_model = _language_model()
+
+    async def run():
+        both_started = asyncio.Event()
+        started = set()
+
+        async def respond(user_input, session_id):
+            started.add(session_id)
+            if len(started) == 2:
+                both_started.set()
+            # Times out if the other session only starts after this one ends
+            await asyncio.wait_for(both_started.wait(), 1)
+            return session_id
+
+        await language_model.initialize()
+        language_model._respond = respond
+        try:
+            return await asyncio.gather(
+                language_model.generate_response("hi", "a"),
+                language_model.generate_response("hi", "b")
+            )
+        finally:
+            await language_model.close()
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+def test_close_fails_requests_in_flight_and_still_queued():
+    language_model = _language_model(max_batch_size=2, max_wait_ms=1.0)
+
+    async def run():
+        in_flight = asyncio.Event()
+
+        async def respond(user_input, session_id):
+            in_flight.set()
+            await asyncio.Event().wait()
+
+        await language_model.initialize()
+        language_model._respond = respond
+        requests = [
+            asyncio.create_task(language_model.generate_response(str(i), "a"))
+            for i in range(4)
+        ]
+        await asyncio.wait_for(in_flight.wait(), 1)
+        await asyncio.wait_for(language_model.close(), 1)
+        return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert len(results) == 4
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_close_fails_requests_still_collecting():
+    # A long window keeps the request in the worker's collection phase
+    language_model = _language_model(max_wait_ms=10_000)
+
+    async def run():
+        await language_model.initialize()
+        request = asyncio.create_task(language_model.generate_response("hi", "a"))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(language_model.close(), 1)
+        return await asyncio.wait_for(asyncio.gather(request, return_exceptions=True), 1)
+
+    result, = asyncio.run(run())
+    assert isinstance(result, RuntimeError)
+
+def test_close_fails_requests_the_worker_never_took():
+    language_model = _language_model()
+
+    async def run():
+        await language_model.initialize()
+        # Queue directly before the worker task has had a chance to run
+        future = asyncio.get_running_loop().create_future()
+        language_model._batch_queue.put_nowait(("hi", "a", future))
+        await asyncio.wait_for(language_model.close(), 1)
+        return await asyncio.wait_for(asyncio.gather(future, return_exceptions=True), 1)
+
+    result, = asyncio.run(run())
+    assert isinstance(result, RuntimeError)